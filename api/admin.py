@@ -1,3 +1,333 @@
-from django.contrib import admin
+import calendar
+import datetime
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.contrib.admin.utils import unquote
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections, transaction
+from django.db.models import Max, Min
+from django.http import HttpResponseRedirect
+from django.template.response import TemplateResponse
+from django.utils.html import format_html
+from django.utils.text import capfirst
+from django.utils.dates import MONTHS
+from django.utils.decorators import method_decorator
+from django.utils.functional import cached_property
+from django.views.decorators.csrf import csrf_protect
+from .models import Entry
+from .sharding import ShardMoving, entry_write, sharding_enabled, shard_alias, shard_aliases
 
-# Register your models here.
+csrf_protect_m = method_decorator(csrf_protect)
+
+CHUNK_SIZE = 1000
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that never runs an exact COUNT(*) over the whole table.
+
+    Unfiltered changelists use the database's statistics when it has them
+    and they show more than `count_limit` rows; otherwise at most
+    `count_limit` rows are counted.
+    """
+    count_limit = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimate_row_count(queryset)
+            if estimate is not None and estimate > self.count_limit:
+                return estimate
+        return queryset[:self.count_limit].count()
+
+
+def estimate_row_count(queryset):
+    """
+    Row count from planner statistics: pg_class on PostgreSQL, sqlite_stat1
+    (written by ANALYZE) on SQLite. None when there are none.
+    """
+    table = queryset.model._meta.db_table
+    connection = connections[queryset.db]
+    if connection.vendor == "postgresql":
+        sql = "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass"
+    elif connection.vendor == "sqlite":
+        if "sqlite_stat1" not in connection.introspection.table_names(include_views=False):
+            return None
+        sql = "SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1"
+    else:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [table])
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    # sqlite_stat1.stat starts with the row count, e.g. "120000 40 1"
+    estimate = int(str(row[0]).split()[0])
+    return estimate if estimate >= 0 else None
+
+
+def chunked_pks(queryset, size=CHUNK_SIZE):
+    """
+    Yield lists of primary keys, walking the primary key index in keyset order.
+    """
+    queryset = queryset.order_by("pk").values_list("pk", flat=True)
+    last_pk = None
+    while True:
+        chunk = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        pks = list(chunk[:size])
+        if not pks:
+            return
+        yield pks
+        last_pk = pks[-1]
+
+
+class ShardListFilter(admin.SimpleListFilter):
+    """
+    Picks the shard database the changelist reads from; defaults to the first.
+    """
+    title = "shard"
+    parameter_name = "shard"
+
+    def lookups(self, request, model_admin):
+        return [(str(index), alias) for index, alias in enumerate(shard_aliases())]
+
+    def choices(self, changelist):
+        current = self.value() or "0"
+        for lookup, title in self.lookup_choices:
+            yield {
+                "selected": current == lookup,
+                "query_string": changelist.get_query_string({self.parameter_name: lookup}),
+                "display": title,
+            }
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        index = int(value) if value and value.isdigit() and int(value) < len(shard_aliases()) else 0
+        return queryset.using(shard_alias(index))
+
+
+def entry_date_bounds():
+    """
+    First and last entry dates, across shards. Kept to one MIN or MAX per
+    query so SQLite answers each from the date index.
+    """
+    aliases = shard_aliases() if sharding_enabled() else ["default"]
+    firsts = [Entry.objects.using(alias).aggregate(first=Min("date"))["first"] for alias in aliases]
+    lasts = [Entry.objects.using(alias).aggregate(last=Max("date"))["last"] for alias in aliases]
+    firsts = [date for date in firsts if date is not None]
+    lasts = [date for date in lasts if date is not None]
+    if not firsts:
+        return None, None
+    return min(firsts), max(lasts)
+
+
+class EntryDateFilter(admin.SimpleListFilter):
+    """
+    Year, then month, filter. Stands in for date_hierarchy, whose choices
+    come from a SELECT DISTINCT over the truncated date of every row.
+    """
+    title = "date"
+    parameter_name = "date"
+
+    def period(self):
+        """
+        (year, month) from the selected value; month is None for a whole year.
+        """
+        value = self.value() or ""
+        year, _, month = value.partition("-")
+        if not year.isdigit() or not 1 <= int(year) <= 9999:
+            return None, None
+        if not month:
+            return int(year), None
+        if month.isdigit() and 1 <= int(month) <= 12:
+            return int(year), int(month)
+        return None, None
+
+    def lookups(self, request, model_admin):
+        first, last = entry_date_bounds()
+        if first is None:
+            return []
+        selected, _ = self.period()
+        choices = []
+        for year in range(last.year, first.year - 1, -1):
+            choices.append((str(year), str(year)))
+            if year == selected:
+                months = range(
+                    last.month if year == last.year else 12,
+                    (first.month if year == first.year else 1) - 1,
+                    -1,
+                )
+                choices.extend((f"{year}-{month:02d}", f"{MONTHS[month]} {year}") for month in months)
+        return choices
+
+    def queryset(self, request, queryset):
+        year, month = self.period()
+        if year is None:
+            return queryset
+        if month is None:
+            start, end = datetime.date(year, 1, 1), datetime.date(year, 12, 31)
+        else:
+            start = datetime.date(year, month, 1)
+            end = start.replace(day=calendar.monthrange(year, month)[1])
+        return queryset.filter(date__range=(start, end))
+
+
+@admin.register(Entry)
+class EntryAdmin(admin.ModelAdmin):
+    list_display = ("id", "title", "user", "date", "current_mood")
+    list_display_links = ("id", "title")
+    list_select_related = ("user",)
+    list_filter = ("current_mood", EntryDateFilter)
+    # Exact username match hits the unique index; no LIKE over content
+    search_fields = ("=user__username",)
+    search_help_text = "Exact username"
+    ordering = ("-id",)
+    sortable_by = ()
+    raw_id_fields = ("user",)
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+    actions = ["delete_in_chunks"]
+
+    def get_list_filter(self, request):
+        if sharding_enabled():
+            return (*self.list_filter, ShardListFilter)
+        return self.list_filter
+
+    def get_list_select_related(self, request):
+        # Users live on the default database, so they cannot be joined from a shard
+        if sharding_enabled():
+            return ()
+        return self.list_select_related
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if sharding_enabled():
+            queryset = queryset.prefetch_related("user")
+        return queryset
+
+    def get_object(self, request, object_id, from_field=None):
+        if not sharding_enabled():
+            return super().get_object(request, object_id, from_field)
+        for alias in shard_aliases():
+            try:
+                return self.get_queryset(request).using(alias).get(pk=object_id)
+            except (Entry.DoesNotExist, ValidationError, ValueError):
+                continue
+        return None
+
+    def get_readonly_fields(self, request, obj=None):
+        # Changing the owner would leave the entry on the old owner's shard
+        if sharding_enabled() and obj is not None:
+            return (*self.readonly_fields, "user")
+        return self.readonly_fields
+
+    def get_entry_user(self, request, object_id=None):
+        """
+        Owner of the entry an add, change or delete writes: the entry's, or
+        for a new entry the submitted user.
+        """
+        if object_id is not None:
+            obj = self.get_object(request, unquote(object_id))
+            return obj.user if obj is not None else None
+        user_id = request.POST.get("user", "")
+        return User.objects.filter(pk=user_id).first() if user_id.isdigit() else None
+
+    def entry_write(self, request, view, object_id):
+        # The stock views open their transaction on router.db_for_write(Entry),
+        # which cannot pick a shard without an entry or a user to go by
+        user = self.get_entry_user(request, object_id)
+        try:
+            if user is None:
+                # Nothing gets written, the view only reports the error
+                with transaction.atomic(using=shard_alias(0)):
+                    return view()
+            with entry_write(user):
+                return view()
+        except ShardMoving as e:
+            self.message_user(request, str(e.detail), messages.ERROR)
+            return HttpResponseRedirect(request.get_full_path())
+
+    @csrf_protect_m
+    def changeform_view(self, request, object_id=None, form_url="", extra_context=None):
+        if not sharding_enabled() or request.method in ("GET", "HEAD", "OPTIONS", "TRACE"):
+            return super().changeform_view(request, object_id, form_url, extra_context)
+        return self.entry_write(
+            request, lambda: self._changeform_view(request, object_id, form_url, extra_context), object_id
+        )
+
+    @csrf_protect_m
+    def delete_view(self, request, object_id, extra_context=None):
+        if not sharding_enabled() or request.method in ("GET", "HEAD", "OPTIONS", "TRACE"):
+            return super().delete_view(request, object_id, extra_context)
+        return self.entry_write(request, lambda: self._delete_view(request, object_id, extra_context), object_id)
+
+    def get_deleted_objects(self, objs, request):
+        # The stock collector asks the router for a database without a user
+        # hint. Entries have no dependent rows, so list them directly.
+        if not sharding_enabled():
+            return super().get_deleted_objects(objs, request)
+        opts = self.model._meta
+        objs = list(objs)
+        perms_needed = set() if self.has_delete_permission(request) else {opts.verbose_name}
+        to_delete = [format_html("{}: {}", capfirst(opts.verbose_name), obj) for obj in objs]
+        return to_delete, {opts.verbose_name_plural: len(objs)}, perms_needed, []
+
+    def get_search_results(self, request, queryset, search_term):
+        # Resolve the username first so no join is needed
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        user_ids = list(User.objects.filter(username=search_term).values_list("pk", flat=True))
+        return queryset.filter(user_id__in=user_ids), False
+
+    def get_actions(self, request):
+        # The stock action loads every selected row for its confirmation page
+        actions = super().get_actions(request)
+        actions.pop("delete_selected", None)
+        return actions
+
+    @admin.action(description="Delete selected entries (in chunks)", permissions=["delete"])
+    def delete_in_chunks(self, request, queryset):
+        """
+        Like the stock delete action, but the confirmation page only counts the
+        rows instead of listing them, and rows are logged and deleted a chunk
+        at a time.
+        """
+        opts = self.model._meta
+        if request.POST.get("post") != "yes":
+            return TemplateResponse(request, "admin/api/entry/delete_in_chunks_confirmation.html", {
+                **self.admin_site.each_context(request),
+                "title": "Are you sure?",
+                "opts": opts,
+                "count": queryset.count(),
+                "objects_name": opts.verbose_name_plural,
+                "chunk_size": CHUNK_SIZE,
+                "selected": request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+                "select_across": request.POST.get("select_across") == "1",
+                "action_checkbox_name": helpers.ACTION_CHECKBOX_NAME,
+            })
+
+        deleted = 0
+        for pks in chunked_pks(queryset):
+            chunk = queryset.model._default_manager.using(queryset.db).filter(pk__in=pks)
+            with transaction.atomic(using=queryset.db):
+                self.log_deletions(request, chunk)
+                _, per_model = chunk.delete()
+            deleted += per_model.get(opts.label, 0)
+        self.message_user(request, f"Deleted {deleted} entries.", messages.SUCCESS)
+
+    def changelist_view(self, request, extra_context=None):
+        response = super().changelist_view(request, extra_context)
+        context = getattr(response, "context_data", None) or {}
+        cl = context.get("cl")
+        if cl is not None and not cl.show_all:
+            results = list(cl.result_list)
+            if len(results) >= cl.list_per_page:
+                # Keyset navigation: next page is everything below the last id shown
+                context["next_cursor_url"] = cl.get_query_string(
+                    {"id__lt": results[-1].pk}, remove=["p"]
+                )
+        return response
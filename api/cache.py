@@ -0,0 +1,23 @@
+from django.core.cache.backends.filebased import FileBasedCache
+
+
+class FileCache(FileBasedCache):
+    """
+    File cache that checks its size once every CULL_INTERVAL sets (an
+    option, default 100) instead of on each one.
+
+    The stock backend lists the whole cache directory on every set to count
+    its entries. Checking less often lets the cache run past MAX_ENTRIES by
+    up to one interval per process.
+    """
+
+    def __init__(self, dir, params):
+        super().__init__(dir, params)
+        self._cull_interval = max(int(params.get("OPTIONS", {}).get("CULL_INTERVAL", 100)), 1)
+        self._sets = 0
+
+    def _cull(self):
+        self._sets += 1
+        if self._sets >= self._cull_interval:
+            self._sets = 0
+            super()._cull()
@@ -0,0 +1,79 @@
+import time
+from django.core.cache import caches
+from django.db.models import Count
+from django.utils.connection import ConnectionProxy
+from .models import mood
+
+CALENDAR_CACHE_TIMEOUT = 60 * 10
+
+cache = ConnectionProxy(caches, "calendar")
+
+
+def calendar_version_key(user_id, year):
+    return f"calendar-version:{user_id}:{year}"
+
+
+def calendar_version(user_id, year):
+    key = calendar_version_key(user_id, year)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def calendar_cache_key(user_id, year):
+    return f"calendar:{user_id}:{year}:{calendar_version(user_id, year)}"
+
+
+def invalidate_calendar(user_id, year):
+    """
+    Move the user's calendar for `year` to a new version. A calendar built
+    before the write is stored under the old version and never read again.
+    """
+    cache.set(calendar_version_key(user_id, year), time.time_ns(), None)
+
+
+def build_calendar(user, year):
+    """
+    Per-day entry counts and dominant mood for one user and year.
+
+    Runs a single GROUP BY (date, current_mood) over the (user, date) index,
+    then folds the rows into one item per day. Ties between moods are broken
+    by their order in `mood` so the result is stable.
+    """
+    rows = (
+        user.entries
+        .filter(date__year=year)
+        .values("date", "current_mood")
+        .annotate(count=Count("id"))
+        .order_by("date")
+    )
+
+    mood_order = {key: index for index, key in enumerate(mood)}
+    days = {}
+    for row in rows:
+        day = days.setdefault(row["date"], {"count": 0, "moods": {}})
+        day["count"] += row["count"]
+        day["moods"][row["current_mood"]] = row["count"]
+
+    return [
+        {
+            "date": date.isoformat(),
+            "count": day["count"],
+            "dominant_mood": min(
+                day["moods"],
+                key=lambda key: (-day["moods"][key], mood_order.get(key, len(mood_order))),
+            ),
+        }
+        for date, day in days.items()
+    ]
+
+
+def get_calendar(user, year):
+    key = calendar_cache_key(user.pk, year)
+    days = cache.get(key)
+    if days is None:
+        days = build_calendar(user, year)
+        cache.set(key, days, CALENDAR_CACHE_TIMEOUT)
+    return days
@@ -0,0 +1,188 @@
+import asyncio
+import atexit
+import bisect
+import json
+import os
+import socket
+import time
+from collections import OrderedDict, deque
+from django.conf import settings
+
+EVENT_BUS_DIR = settings.EVENT_BUS_DIR
+# Events kept per user for Last-Event-ID resumes, and users kept per worker
+HISTORY_SIZE = getattr(settings, "EVENT_HISTORY_SIZE", 100)
+HISTORY_USERS = getattr(settings, "EVENT_HISTORY_USERS", 10000)
+MAX_DATAGRAM = 64 * 1024
+# Titles have no length limit; events carry the start so they always fit a datagram
+EVENT_TITLE_LENGTH = 200
+
+_publisher = None
+
+
+def entry_event(event_type, entry):
+    """
+    Compact event for an entry write; content is left out and long titles are
+    cut to EVENT_TITLE_LENGTH, clients fetch the entry if they need more.
+    """
+    data = {"id": entry.pk}
+    if event_type != "deleted":
+        data.update(date=str(entry.date), title=entry.title[:EVENT_TITLE_LENGTH], current_mood=entry.current_mood)
+    return {"id": time.time_ns(), "user": entry.user_id, "type": event_type, "entry": data}
+
+
+def publish(event, directory=EVENT_BUS_DIR):
+    """
+    Send `event` to every worker listening on the bus. Never blocks: a full or
+    stale socket just misses the event.
+    """
+    global _publisher
+    try:
+        paths = [entry.path for entry in os.scandir(directory) if entry.name.endswith(".sock")]
+    except FileNotFoundError:
+        return
+    if not paths:
+        return
+    if _publisher is None:
+        _publisher = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        _publisher.setblocking(False)
+    payload = json.dumps(event, separators=(",", ":")).encode()
+    for path in paths:
+        try:
+            _publisher.sendto(payload, path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            # Worker died without cleaning up
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+        except (BlockingIOError, OSError):
+            pass
+
+
+class UserHistory:
+    def __init__(self, horizon):
+        self.events = deque(maxlen=HISTORY_SIZE)
+        # Events with an id up to here may have been missed
+        self.horizon = horizon
+        self.queues = set()
+
+    def append(self, event):
+        if self.events and event["id"] < self.events[-1]["id"]:
+            # Ids are the publishers' clocks, so events from different workers
+            # can arrive out of order. A client that already saw the newer one
+            # and resumes from it would never get this one.
+            self.horizon = max(self.horizon, self.events[-1]["id"] + 1)
+        if len(self.events) == self.events.maxlen:
+            self.horizon = max(self.horizon, self.events.popleft()["id"])
+        bisect.insort(self.events, event, key=lambda item: item["id"])
+        for queue in self.queues:
+            queue.put_nowait(event)
+
+    def since(self, last_id):
+        """
+        Events after `last_id`, or None if some of them are no longer known.
+        """
+        if last_id < self.horizon:
+            return None
+        return [event for event in self.events if event["id"] > last_id]
+
+
+class EventBus:
+    """
+    Per-worker end of the bus: a datagram socket in EVENT_BUS_DIR that every
+    publisher writes to, fanned out to the worker's open SSE connections.
+    """
+
+    def __init__(self, directory=EVENT_BUS_DIR):
+        self.directory = directory
+        self.path = None
+        self.sock = None
+        # Set once the socket is bound: events published before then were never received
+        self.horizon = None
+        self.users = OrderedDict()
+
+    def start(self, loop=None):
+        if self.sock is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self.path = os.path.join(self.directory, f"{os.getpid()}.sock")
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(self.path)
+        self.horizon = time.time_ns()
+        self.sock.setblocking(False)
+        (loop or asyncio.get_running_loop()).add_reader(self.sock.fileno(), self._receive)
+        atexit.register(self.stop)
+
+    def stop(self):
+        if self.sock is None:
+            return
+        try:
+            asyncio.get_event_loop().remove_reader(self.sock.fileno())
+        except (RuntimeError, ValueError):
+            pass
+        self.sock.close()
+        self.sock = None
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def _receive(self):
+        while True:
+            try:
+                payload = self.sock.recv(MAX_DATAGRAM)
+            except (BlockingIOError, OSError):
+                return
+            try:
+                event = json.loads(payload)
+                user_id = event["user"]
+            except (ValueError, TypeError, KeyError):
+                self.lost_event()
+                continue
+            self.history(user_id).append(event)
+
+    def lost_event(self):
+        """
+        An event could not be read, so its user is unknown: no resume from
+        before now can be trusted to have seen everything.
+        """
+        self.horizon = time.time_ns()
+        for history in self.users.values():
+            history.horizon = max(history.horizon, self.horizon)
+
+    def history(self, user_id):
+        user_id = str(user_id)
+        history = self.users.get(user_id)
+        if history is None:
+            history = self.users[user_id] = UserHistory(self.horizon)
+            if len(self.users) > HISTORY_USERS:
+                evicted_id, evicted = next(
+                    (item for item in self.users.items() if not item[1].queues), (None, None)
+                )
+                if evicted is not None:
+                    del self.users[evicted_id]
+                    # Histories created from now on cannot vouch for earlier events
+                    self.horizon = time.time_ns()
+        self.users.move_to_end(user_id)
+        return history
+
+    def subscribe(self, user_id, last_id=None):
+        """
+        Register a connection; returns its queue and the backlog to replay first.
+        The backlog is None when `last_id` is too old to resume from.
+        """
+        history = self.history(user_id)
+        queue = asyncio.Queue()
+        history.queues.add(queue)
+        backlog = [] if last_id is None else history.since(last_id)
+        return queue, backlog
+
+    def unsubscribe(self, user_id, queue):
+        history = self.users.get(str(user_id))
+        if history is not None:
+            history.queues.discard(queue)
+
+
+bus = EventBus()
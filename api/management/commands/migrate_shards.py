@@ -0,0 +1,27 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from api.sharding import seed_entry_ids, shard_aliases
+
+
+class Command(BaseCommand):
+    help = "Run migrate against every entry shard database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--run-syncdb", action="store_true", help="Create tables for apps without migrations.")
+
+    def handle(self, *args, **options):
+        aliases = shard_aliases()
+        if not aliases:
+            self.stdout.write("ENTRY_SHARDS is 0, nothing to migrate.")
+            return
+        for alias in aliases:
+            if options["verbosity"]:
+                self.stdout.write(f"Migrating {alias}")
+            call_command(
+                "migrate",
+                database=alias,
+                run_syncdb=options["run_syncdb"],
+                verbosity=options["verbosity"],
+                interactive=False,
+            )
+        seed_entry_ids()
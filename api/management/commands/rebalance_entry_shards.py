@@ -0,0 +1,71 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from api.models import EntryShard
+from api.sharding import ShardMoveError, drain_entries, sharding_enabled, home_shard, move_user, unconfigured_shard
+from django.conf import settings
+
+
+class Command(BaseCommand):
+    help = (
+        "Move users' entries between shards while the API stays up. "
+        "Either move one user with --user/--to, or move every user whose "
+        "shard differs from their home shard (after changing ENTRY_SHARDS) with --all. "
+        "When lowering ENTRY_SHARDS, set ENTRY_SHARDS_RETIRED to the old value until --all has run. "
+        "--from-default moves entries written before sharding was enabled onto the shards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, help="Id of the user to move.")
+        parser.add_argument("--to", type=int, help="Target shard index.")
+        parser.add_argument("--all", action="store_true", help="Move every user to their home shard.")
+        parser.add_argument(
+            "--drain", metavar="ALIAS",
+            help="Move every entry stored on database ALIAS to its user's shard.",
+        )
+        parser.add_argument(
+            "--from-default", dest="drain", action="store_const", const="default",
+            help="Same as --drain default, for entries written before ENTRY_SHARDS was set.",
+        )
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if not sharding_enabled():
+            raise CommandError("ENTRY_SHARDS is 0, there is nothing to rebalance.")
+        missing = unconfigured_shard()
+        if missing is not None:
+            raise CommandError(
+                f"Users are assigned to shard {missing}, which has no database configured. "
+                f"Set ENTRY_SHARDS_RETIRED={missing + 1} so the old shards can be drained."
+            )
+
+        if options["drain"]:
+            if options["drain"] not in settings.DATABASES:
+                raise CommandError(f"Unknown database {options['drain']}.")
+            try:
+                moved = drain_entries(options["drain"], chunk_size=options["chunk_size"])
+            except ShardMoveError as e:
+                raise CommandError(str(e))
+            self.stdout.write(f"Moved {moved} entries off {options['drain']}")
+            return
+
+        if options["all"]:
+            moves = [
+                (entry_shard.user_id, home_shard(entry_shard.user_id))
+                for entry_shard in EntryShard.objects.order_by("pk").iterator()
+                if entry_shard.shard != home_shard(entry_shard.user_id)
+            ]
+        elif options["user"] is not None and options["to"] is not None:
+            if not 0 <= options["to"] < settings.ENTRY_SHARDS:
+                raise CommandError(f"--to must be between 0 and {settings.ENTRY_SHARDS - 1}.")
+            if not User.objects.filter(pk=options["user"]).exists():
+                raise CommandError(f"User {options['user']} does not exist.")
+            moves = [(options["user"], options["to"])]
+        else:
+            raise CommandError("Pass either --user and --to, or --all.")
+
+        for user_id, target in moves:
+            try:
+                moved = move_user(user_id, target, chunk_size=options["chunk_size"])
+            except ShardMoveError as e:
+                raise CommandError(str(e))
+            self.stdout.write(f"User {user_id}: {moved} entries on shard {target}")
@@ -9,12 +9,86 @@ mood = {
         "neutral": "Neutral"
         }
 
+class EntryQuerySet(models.QuerySet):
+    def create(self, **kwargs):
+        # Unless a database was picked with using(), let save() ask the router
+        # with the instance as a hint, which it needs to find the user's shard
+        obj = self.model(**kwargs)
+        self._for_write = True
+        obj.save(force_insert=True, using=self._db)
+        return obj
+
+
 class Entry(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="entries")
+    # No database constraint or ORM cascade: with sharding enabled entries live
+    # in a different database from auth_user. Deleting a user deletes their
+    # entries through a pre_delete signal (api/signals.py).
+    user = models.ForeignKey(User, on_delete=models.DO_NOTHING, related_name="entries", db_constraint=False)
     date = models.DateField(auto_now_add=True)
     title = models.CharField(blank=False)
     content = models.TextField(blank=False)
     current_mood = models.CharField(choices=mood)
 
+    objects = EntryQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "date"], name="entry_user_date_idx"),
+            models.Index(fields=["date"], name="entry_date_idx"),
+            models.Index(fields=["current_mood", "date"], name="entry_mood_date_idx"),
+        ]
+
     def __str__(self):
         return f"{self.title} - {self.date}"
+
+    def save(self, *args, **kwargs):
+        from .sharding import sharding_enabled, next_entry_id
+        # Shards cannot share an autoincrement, so ids come from the default database
+        if self.pk is None and sharding_enabled():
+            self.pk = next_entry_id()
+            kwargs.setdefault("force_insert", True)
+        super().save(*args, **kwargs)
+
+    def validate_constraints(self, exclude=None):
+        # There are none, and looking up the database for them needs a user,
+        # which a form being validated may not have yet
+        if any(constraints for _, constraints in self.get_constraints()):
+            super().validate_constraints(exclude)
+
+
+class TokenRevocation(models.Model):
+    """
+    Append-only revocation record.
+
+    `key` is either "jti:<jti>" for a single refresh token or "user:<id>" for
+    every token of that user issued at or before `revoked_at`.
+    """
+    key = models.CharField(max_length=255, db_index=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="token_revocations")
+    revoked_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.key} - {self.revoked_at}"
+
+
+class EntryShard(models.Model):
+    """
+    Which shard database holds a user's entries.
+
+    `moving` is set while the rebalance command syncs the user's entries to
+    another shard; writes are refused until it is cleared.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="entry_shard")
+    shard = models.PositiveSmallIntegerField()
+    moving = models.BooleanField(default=False)
+
+    def __str__(self):
+        return f"{self.user_id} - shard {self.shard}"
+
+
+class EntryIdBlock(models.Model):
+    """
+    Single-row counter handing out blocks of Entry ids to workers.
+    """
+    next_id = models.BigIntegerField()
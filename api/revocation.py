@@ -0,0 +1,146 @@
+import hashlib
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+from .models import TokenRevocation
+
+# Bits in the per-worker filter (128 KiB) and hashes per key. At 100k live
+# revocations this gives roughly a 1% false positive rate.
+FILTER_BITS = getattr(settings, "TOKEN_REVOCATION_FILTER_BITS", 1 << 20)
+FILTER_HASHES = getattr(settings, "TOKEN_REVOCATION_FILTER_HASHES", 7)
+# How often a worker pulls new revocations, and how often it rebuilds from
+# scratch to drop expired ones and pick up rows committed out of id order.
+REFRESH_INTERVAL = getattr(settings, "TOKEN_REVOCATION_REFRESH_INTERVAL", 5)
+REBUILD_INTERVAL = getattr(settings, "TOKEN_REVOCATION_REBUILD_INTERVAL", 300)
+
+
+def jti_key(jti):
+    return f"jti:{jti}"
+
+
+def user_key(user_id):
+    return f"user:{user_id}"
+
+
+class BloomFilter:
+    def __init__(self, bits=FILTER_BITS, hashes=FILTER_HASHES):
+        self.bits = bits
+        self.hashes = hashes
+        self.array = bytearray((bits + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * second) % self.bits for i in range(self.hashes))
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.array[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self.array[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class RevocationList:
+    """
+    Per-worker view of `TokenRevocation`.
+
+    Checks go through a Bloom filter first, so a token that was never revoked
+    is accepted without a query. Only filter hits are confirmed against the
+    database. The filter is topped up with rows newer than the last id seen.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.filter = BloomFilter()
+            self.last_id = 0
+            self.refreshed_at = None
+            self.rebuilt_at = None
+
+    def refresh(self, force=False):
+        now = time.monotonic()
+        if not force and self.refreshed_at is not None and now - self.refreshed_at < REFRESH_INTERVAL:
+            return
+        with self.lock:
+            if self.rebuilt_at is None or now - self.rebuilt_at >= REBUILD_INTERVAL:
+                prune_revocations()
+                self.filter = BloomFilter()
+                self.last_id = 0
+                self.rebuilt_at = now
+            rows = (
+                TokenRevocation.objects
+                .filter(id__gt=self.last_id, expires_at__gt=timezone.now())
+                .order_by("id")
+                .values_list("id", "key")
+            )
+            for row_id, key in rows.iterator():
+                self.filter.add(key)
+                self.last_id = row_id
+            self.refreshed_at = now
+
+    def add(self, key):
+        with self.lock:
+            self.filter.add(key)
+
+    def is_revoked(self, token):
+        self.refresh()
+        jti = token.get(api_settings.JTI_CLAIM)
+        user_id = token.get(api_settings.USER_ID_CLAIM)
+
+        if jti is not None and jti_key(jti) in self.filter:
+            if TokenRevocation.objects.filter(key=jti_key(jti)).exists():
+                return True
+        if user_id is not None and user_key(user_id) in self.filter:
+            issued_at = datetime.fromtimestamp(token.get("iat", 0), tz=dt_timezone.utc)
+            # iat is truncated to the second, so a token issued in the same
+            # second as the revocation is treated as revoked too
+            if TokenRevocation.objects.filter(
+                key=user_key(user_id), revoked_at__gte=issued_at
+            ).exists():
+                return True
+        return False
+
+
+revocation_list = RevocationList()
+
+
+def _expires_at(token):
+    return datetime.fromtimestamp(token["exp"], tz=dt_timezone.utc)
+
+
+def prune_revocations():
+    """
+    Delete revocations whose tokens have all expired anyway.
+    """
+    return TokenRevocation.objects.filter(expires_at__lte=timezone.now()).delete()[0]
+
+
+def revoke_token(token, user):
+    """
+    Revoke a single refresh token. Revoking it again is a no-op.
+    """
+    key = jti_key(token[api_settings.JTI_CLAIM])
+    if not TokenRevocation.objects.filter(key=key).exists():
+        TokenRevocation.objects.create(key=key, user=user, expires_at=_expires_at(token))
+    revocation_list.add(key)
+
+
+def revoke_all(user):
+    """
+    Revoke every refresh token issued to `user` up to now.
+    """
+    key = user_key(getattr(user, api_settings.USER_ID_FIELD))
+    TokenRevocation.objects.create(
+        key=key,
+        user=user,
+        expires_at=timezone.now() + api_settings.REFRESH_TOKEN_LIFETIME + timedelta(seconds=1),
+    )
+    revocation_list.add(key)
@@ -0,0 +1,64 @@
+from django.contrib.auth.models import User
+from .models import Entry
+from .sharding import (
+    ShardRoutingError,
+    sharding_enabled,
+    shard_alias,
+    is_shard_alias,
+    get_entry_shard,
+    get_entry_shard_by_id,
+)
+
+
+class EntryShardRouter:
+    """
+    Sends Entry queries to the shard holding the owning user's entries.
+
+    Querysets have to carry the user as an instance hint, which related
+    managers do for free: use `user.entries` rather than `Entry.objects`, or
+    pick a shard explicitly with `using()`. A query with neither raises
+    ShardRoutingError instead of silently running against the default
+    database. Everything else stays on the default database.
+    """
+
+    def _db_for_entry(self, instance):
+        if isinstance(instance, Entry):
+            if not instance._state.adding and instance._state.db:
+                return instance._state.db
+            if Entry.user.is_cached(instance):
+                return shard_alias(get_entry_shard(instance.user).shard)
+            if instance.user_id is not None:
+                return shard_alias(get_entry_shard_by_id(instance.user_id).shard)
+            return None
+        if isinstance(instance, User):
+            return shard_alias(get_entry_shard(instance).shard)
+        return None
+
+    def db_for_read(self, model, **hints):
+        if not sharding_enabled():
+            return None
+        if model is Entry:
+            db = self._db_for_entry(hints.get("instance"))
+            if db is None:
+                raise ShardRoutingError(
+                    "Entry queries need a user when sharding is enabled: "
+                    "use user.entries or Entry.objects.using(<shard alias>)."
+                )
+            return db
+        # Related lookups from an entry (entry.user) must not follow it to the shard
+        return "default"
+
+    db_for_write = db_for_read
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if isinstance(obj1, Entry) or isinstance(obj2, Entry):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        is_entry = app_label == "api" and model_name == "entry"
+        if is_shard_alias(db):
+            return is_entry
+        if is_entry and sharding_enabled():
+            return False
+        return None
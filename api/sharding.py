@@ -0,0 +1,322 @@
+import os
+import threading
+from contextlib import contextmanager
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import IntegrityError, connections, transaction
+from django.db.models import F, Max
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from .models import Entry, EntryShard, EntryIdBlock
+
+ID_BLOCK_SIZE = getattr(settings, "ENTRY_ID_BLOCK_SIZE", 1000)
+SHARD_ALIAS_PREFIX = "entries_"
+
+
+class ShardRoutingError(Exception):
+    """
+    An Entry query could not be tied to a user while sharding is enabled.
+    """
+
+
+class ShardMoveError(Exception):
+    """
+    Entries kept arriving on the old database after a move was switched over.
+    """
+
+
+class ShardMoving(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Your entries are being moved, try again in a moment."
+    default_code = "shard_moving"
+
+
+def sharding_enabled():
+    return settings.ENTRY_SHARDS > 0
+
+
+def shard_alias(index):
+    return f"{SHARD_ALIAS_PREFIX}{index}"
+
+
+def is_shard_alias(alias):
+    return alias.startswith(SHARD_ALIAS_PREFIX)
+
+
+def shard_aliases():
+    """
+    Every configured shard, including retired ones still being drained.
+    """
+    shards = max(settings.ENTRY_SHARDS, settings.ENTRY_SHARDS_RETIRED)
+    return [shard_alias(index) for index in range(shards)]
+
+
+def unconfigured_shard():
+    """
+    Highest shard some user is assigned to that has no database configured,
+    or None. Happens when ENTRY_SHARDS is lowered without ENTRY_SHARDS_RETIRED.
+    """
+    return EntryShard.objects.filter(shard__gte=len(shard_aliases())).aggregate(Max("shard"))["shard__max"]
+
+
+def home_shard(user_id):
+    return user_id % settings.ENTRY_SHARDS
+
+
+def get_entry_shard(user):
+    """
+    The user's shard assignment, created on first use and cached on `user`.
+
+    Assignments are persisted so that changing ENTRY_SHARDS never moves
+    existing users; use the rebalance_entry_shards command for that.
+    """
+    try:
+        return user.entry_shard
+    except EntryShard.DoesNotExist:
+        entry_shard, _ = EntryShard.objects.get_or_create(user=user, defaults={"shard": home_shard(user.pk)})
+        user.entry_shard = entry_shard
+        return entry_shard
+
+
+def get_entry_shard_by_id(user_id):
+    entry_shard, _ = EntryShard.objects.get_or_create(user_id=user_id, defaults={"shard": home_shard(user_id)})
+    return entry_shard
+
+
+@contextmanager
+def entry_write(user):
+    """
+    Run a write of `user`'s entries in a transaction on their shard, refused
+    with ShardMoving while they are being moved.
+
+    The assignment is read again after the write, before commit. The write
+    holds the shard's write lock by then, and move_user takes that lock for
+    its final sync, so a write either finishes before the sync copies the
+    rows or finds the move and rolls back.
+    """
+    if not sharding_enabled():
+        yield
+        return
+    entry_shard = get_entry_shard(user)
+    if entry_shard.moving:
+        raise ShardMoving()
+    with transaction.atomic(using=shard_alias(entry_shard.shard)):
+        yield
+        current = EntryShard.objects.filter(pk=user.pk).values_list("shard", "moving").first()
+        if current != (entry_shard.shard, False):
+            raise ShardMoving()
+
+
+class EntryIdAllocator:
+    """
+    Hands out Entry ids from blocks reserved in the default database, so
+    each worker writes the counter once per ID_BLOCK_SIZE entries.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+        # A forked worker must not hand out ids from its parent's block
+        os.register_at_fork(after_in_child=self.reset)
+
+    def reset(self):
+        self.next_id = 0
+        self.end_id = 0
+
+    def reserve(self):
+        with transaction.atomic(using="default"):
+            if not self._take_block():
+                start = _first_entry_id()
+                try:
+                    with transaction.atomic(using="default"):
+                        EntryIdBlock.objects.create(pk=1, next_id=start + ID_BLOCK_SIZE)
+                except IntegrityError:
+                    # Another worker created the counter first
+                    self._take_block()
+            end_id = EntryIdBlock.objects.get(pk=1).next_id
+        self.next_id = end_id - ID_BLOCK_SIZE
+        self.end_id = end_id
+
+    def _take_block(self):
+        return EntryIdBlock.objects.filter(pk=1).update(next_id=F("next_id") + ID_BLOCK_SIZE)
+
+    def __call__(self):
+        with self.lock:
+            if self.next_id >= self.end_id:
+                self.reserve()
+            entry_id = self.next_id
+            self.next_id += 1
+            return entry_id
+
+
+next_entry_id = EntryIdAllocator()
+
+
+def _first_entry_id():
+    # Start above every id in use, including entries left on the default
+    # database from before sharding was enabled
+    aliases = shard_aliases()
+    if _has_entry_table("default"):
+        aliases.append("default")
+    return max(
+        Entry.objects.using(alias).aggregate(Max("pk"))["pk__max"] or 0
+        for alias in aliases
+    ) + 1
+
+
+def seed_entry_ids():
+    """
+    Create the id counter up front so workers never race to create it.
+    """
+    EntryIdBlock.objects.get_or_create(pk=1, defaults={"next_id": _first_entry_id()})
+
+
+def _has_entry_table(alias):
+    return Entry._meta.db_table in connections[alias].introspection.table_names()
+
+
+def _upsert_entries(alias, entries):
+    """
+    Insert or overwrite `entries` in `alias`, keeping ids and dates as they are.
+    """
+    connection = connections[alias]
+    fields = Entry._meta.concrete_fields
+    columns = [connection.ops.quote_name(field.column) for field in fields]
+    pk_column = connection.ops.quote_name(Entry._meta.pk.column)
+    sql = "INSERT INTO {table} ({columns}) VALUES ({params}) ON CONFLICT ({pk}) DO UPDATE SET {updates}".format(
+        table=connection.ops.quote_name(Entry._meta.db_table),
+        columns=", ".join(columns),
+        params=", ".join(["%s"] * len(columns)),
+        pk=pk_column,
+        updates=", ".join(f"{column} = excluded.{column}" for column in columns if column != pk_column),
+    )
+    rows = [
+        [field.get_db_prep_save(getattr(entry, field.attname), connection) for field in fields]
+        for entry in entries
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def _delete_entries(alias, **filters):
+    """
+    Delete without signals: moving rows is not a delete as far as clients are concerned.
+    """
+    queryset = Entry.objects.using(alias).filter(**filters)
+    with connections[alias].cursor() as cursor:
+        sql, params = queryset.values("pk").query.sql_with_params()
+        cursor.execute(
+            "DELETE FROM {table} WHERE {pk} IN ({subquery})".format(
+                table=connections[alias].ops.quote_name(Entry._meta.db_table),
+                pk=connections[alias].ops.quote_name(Entry._meta.pk.column),
+                subquery=sql,
+            ),
+            params,
+        )
+
+
+def _lock_writes(alias):
+    """
+    Take `alias`'s write lock for the rest of the transaction: any write
+    statement does on SQLite, even one that matches no rows. Waits for
+    writes in flight to commit and holds new ones off.
+    """
+    with connections[alias].cursor() as cursor:
+        cursor.execute("DELETE FROM {table} WHERE 1 = 0".format(
+            table=connections[alias].ops.quote_name(Entry._meta.db_table),
+        ))
+
+
+def _copy_entries(user_id, source, target, chunk_size):
+    entries = Entry.objects.using(source).filter(user_id=user_id).order_by("pk")
+    copied = []
+    last_pk = 0
+    while True:
+        chunk = list(entries.filter(pk__gt=last_pk)[:chunk_size])
+        if not chunk:
+            return copied
+        with transaction.atomic(using=target):
+            _upsert_entries(target, chunk)
+        copied.extend(entry.pk for entry in chunk)
+        last_pk = chunk[-1].pk
+
+
+def _delete_copied(alias, user_id, pks, chunk_size):
+    for start in range(0, len(pks), chunk_size):
+        _delete_entries(alias, user_id=user_id, pk__in=pks[start:start + chunk_size])
+
+
+def _drain_user(user_id, source, target, chunk_size, attempts=3):
+    """
+    Copy whatever the user still has on `source` to `target` and delete
+    exactly the rows copied, until `source` is empty.
+    """
+    moved = 0
+    for _ in range(attempts):
+        copied = _copy_entries(user_id, source, target, chunk_size)
+        if not copied:
+            return moved
+        _delete_copied(source, user_id, copied, chunk_size)
+        moved += len(copied)
+    if Entry.objects.using(source).filter(user_id=user_id).exists():
+        raise ShardMoveError(
+            f"User {user_id} is still writing entries to {source}; "
+            f"run rebalance_entry_shards --drain {source} once that stops."
+        )
+    return moved
+
+
+def drain_entries(source, chunk_size=1000):
+    """
+    Move entries stored on `source` to the shard each user is assigned to.
+
+    Covers rows left on the default database from before ENTRY_SHARDS was
+    set (the router no longer reads them there) and rows left on an old
+    shard by a move that could not finish. Returns the number moved.
+    """
+    if not _has_entry_table(source):
+        return 0
+    user_ids = set(Entry.objects.using(source).order_by().values_list("user_id", flat=True).distinct())
+    moved = 0
+    for user_id in User.objects.filter(pk__in=user_ids).order_by("pk").values_list("pk", flat=True):
+        target = shard_alias(get_entry_shard_by_id(user_id).shard)
+        if target != source:
+            moved += _drain_user(user_id, source, target, chunk_size)
+    return moved
+
+
+def move_user(user_id, target, chunk_size=1000):
+    """
+    Move a user's entries to shard `target` while the API stays up.
+
+    Entries are copied while the user keeps writing to the old shard. New
+    writes are then refused (ShardMoving), and the final sync, the switch of
+    the assignment and the delete from the old shard run holding the old
+    shard's write lock. Writes in flight finish first and later ones roll
+    back (see entry_write), so the old shard holds exactly what was copied.
+    """
+    entry_shard = get_entry_shard_by_id(user_id)
+    if entry_shard.shard == target:
+        return 0
+    source_alias, target_alias = shard_alias(entry_shard.shard), shard_alias(target)
+
+    _copy_entries(user_id, source_alias, target_alias, chunk_size)
+
+    EntryShard.objects.filter(pk=user_id).update(moving=True)
+    try:
+        with transaction.atomic(using=source_alias):
+            _lock_writes(source_alias)
+            copied = _copy_entries(user_id, source_alias, target_alias, chunk_size)
+            # Drop anything deleted on the old shard since the first copy
+            stale = sorted(
+                set(Entry.objects.using(target_alias).filter(user_id=user_id).values_list("pk", flat=True))
+                - set(copied)
+            )
+            for start in range(0, len(stale), chunk_size):
+                _delete_entries(target_alias, pk__in=stale[start:start + chunk_size])
+            _delete_copied(source_alias, user_id, copied, chunk_size)
+            # Last, so a failure before this leaves the user where they were
+            EntryShard.objects.filter(pk=user_id).update(shard=target, moving=False)
+    finally:
+        EntryShard.objects.filter(pk=user_id, moving=True).update(moving=False)
+    return len(copied)
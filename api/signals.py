@@ -0,0 +1,48 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from .models import Entry, EntryShard
+from .calendar import invalidate_calendar
+from .events import entry_event, publish
+from .sharding import sharding_enabled, shard_alias
+
+
+@receiver(post_save, sender=Entry)
+@receiver(post_delete, sender=Entry)
+def entry_changed(sender, instance, **kwargs):
+    """
+    Invalidate the cached calendar for the year the entry belongs to, once the
+    write is visible to readers rebuilding it.
+    """
+    if instance.date is not None:
+        user_id, year = instance.user_id, instance.date.year
+        transaction.on_commit(lambda: invalidate_calendar(user_id, year), using=instance._state.db)
+
+
+@receiver(post_save, sender=Entry)
+def entry_saved(sender, instance, created, **kwargs):
+    """
+    Tell the user's open event streams about the write once it is committed.
+    """
+    event = entry_event("created" if created else "updated", instance)
+    transaction.on_commit(lambda: publish(event), using=instance._state.db)
+
+
+@receiver(post_delete, sender=Entry)
+def entry_deleted(sender, instance, **kwargs):
+    event = entry_event("deleted", instance)
+    transaction.on_commit(lambda: publish(event), using=instance._state.db)
+
+
+@receiver(pre_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    """
+    Cascade to the user's entries, which the ORM's collector does not follow.
+    """
+    if not sharding_enabled():
+        Entry.objects.filter(user=instance).delete()
+        return
+    entry_shard = EntryShard.objects.filter(user=instance).first()
+    if entry_shard is not None:
+        Entry.objects.using(shard_alias(entry_shard.shard)).filter(user=instance).delete()
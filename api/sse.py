@@ -0,0 +1,125 @@
+import asyncio
+import json
+import time
+from urllib.parse import parse_qs
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from .events import bus
+
+KEEPALIVE_INTERVAL = 15
+RETRY_MS = 3000
+
+
+def format_event(event):
+    data = json.dumps(event["entry"], separators=(",", ":"))
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {data}\n\n".encode()
+
+
+class EntryEventsApp:
+    """
+    ASGI app streaming a user's entry events as server-sent events.
+
+    EventSource cannot send headers, so the access token may also be given as
+    `?token=`. Reconnecting clients send Last-Event-ID and get what they
+    missed, or a `reset` event telling them to refetch their entries. The
+    stream ends when the access token expires, so clients reconnect with a
+    fresh one.
+    """
+
+    async def __call__(self, scope, receive, send):
+        if scope["method"] != "GET":
+            return await self.respond(send, 405, b"Method not allowed.")
+
+        headers = {name.decode("latin-1").lower(): value.decode("latin-1") for name, value in scope["headers"]}
+        query = parse_qs(scope.get("query_string", b"").decode())
+        token = self.authenticate(headers, query)
+        if token is None:
+            return await self.respond(send, 401, b"Authentication credentials were not provided or are invalid.")
+
+        last_id = headers.get("last-event-id") or query.get("last_event_id", [None])[0]
+        try:
+            last_id = int(last_id) if last_id else None
+        except ValueError:
+            last_id = None
+
+        user_id = token[api_settings.USER_ID_CLAIM]
+        bus.start()
+        queue, backlog = bus.subscribe(user_id, last_id)
+        try:
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/event-stream"),
+                    (b"cache-control", b"no-cache"),
+                    (b"x-accel-buffering", b"no"),
+                ],
+            })
+            body = f"retry: {RETRY_MS}\n\n".encode()
+            if backlog is None:
+                body += b"event: reset\ndata: {}\n\n"
+            else:
+                body += b"".join(format_event(event) for event in backlog)
+            await send({"type": "http.response.body", "body": body, "more_body": True})
+            await self.stream(queue, receive, send, expires_at=token["exp"])
+        finally:
+            bus.unsubscribe(user_id, queue)
+
+    async def stream(self, queue, receive, send, expires_at):
+        disconnected = asyncio.ensure_future(self.wait_disconnect(receive))
+        next_event = asyncio.ensure_future(queue.get())
+        try:
+            while True:
+                remaining = expires_at - time.time()
+                if remaining <= 0:
+                    await send({"type": "http.response.body", "body": b""})
+                    return
+                done, _ = await asyncio.wait(
+                    {disconnected, next_event},
+                    timeout=min(KEEPALIVE_INTERVAL, remaining),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if disconnected in done:
+                    return
+                if next_event in done:
+                    body = format_event(next_event.result())
+                    next_event = asyncio.ensure_future(queue.get())
+                else:
+                    body = b": keepalive\n\n"
+                await send({"type": "http.response.body", "body": body, "more_body": True})
+        finally:
+            disconnected.cancel()
+            next_event.cancel()
+
+    async def wait_disconnect(self, receive):
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    def authenticate(self, headers, query):
+        raw = None
+        parts = headers.get("authorization", "").split()
+        if len(parts) == 2 and parts[0] in api_settings.AUTH_HEADER_TYPES:
+            raw = parts[1]
+        elif "token" in query:
+            raw = query["token"][0]
+        if raw is None:
+            return None
+        try:
+            token = AccessToken(raw)
+        except TokenError:
+            return None
+        if api_settings.USER_ID_CLAIM not in token:
+            return None
+        return token
+
+    async def respond(self, send, status, body):
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"text/plain")],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+entry_events = EntryEventsApp()
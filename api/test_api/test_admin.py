@@ -0,0 +1,185 @@
+import datetime
+from django.contrib.admin.models import DELETION, LogEntry
+from django.contrib.auth.models import User
+from contextlib import ExitStack
+from django.db import connections
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from ..admin import EntryAdmin, EntryDateFilter, EstimatedCountPaginator, chunked_pks, estimate_row_count
+from ..models import Entry, EntryShard
+from ..sharding import sharding_enabled
+
+class EntryAdminTest(TestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(username="admin", email="admin@gmail.com", password="admin_123")
+        self.user = User.objects.create_user(username="simba", email="simba@gmail.com", password="simba_123")
+        self.client.force_login(self.admin_user)
+        self.url = reverse("admin:api_entry_changelist")
+        # The changelist reads the first shard unless told otherwise
+        if sharding_enabled():
+            EntryShard.objects.create(user=self.user, shard=0)
+        self.db = self.user.entries.all().db
+
+    def create_entries(self, count):
+        for i in range(count):
+            self.user.entries.create(title=f"Entry {i}", content="Content", current_mood="happy")
+
+    def get_changelist(self):
+        with ExitStack() as stack:
+            queries = [stack.enter_context(CaptureQueriesContext(connections[alias])) for alias in {"default", self.db}]
+            response = self.client.get(self.url)
+        return response, [query for captured in queries for query in captured]
+
+    def test_changelist_no_exact_count(self):
+        """
+        Testing the changelist renders without COUNT(*) over the whole table or per-row user queries
+        """
+        self.create_entries(5)
+        _, few = self.get_changelist()
+
+        self.create_entries(30)
+        response, queries = self.get_changelist()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), len(few))
+        # Any count is bounded by the paginator's limit
+        entry_queries = [q["sql"] for q in queries if '"api_entry"' in q["sql"]]
+        self.assertFalse([sql for sql in entry_queries if "COUNT(" in sql.upper() and "LIMIT" not in sql.upper()])
+
+    def test_date_filter(self):
+        """
+        Testing the year and month filter narrows the changelist without a DISTINCT over truncated dates
+        """
+        self.create_entries(3)
+        dates = [datetime.date(2024, 3, 5), datetime.date(2024, 11, 30), datetime.date(2025, 1, 1)]
+        for entry, date in zip(self.user.entries.order_by("id"), dates):
+            self.user.entries.filter(pk=entry.pk).update(date=date)
+
+        response, queries = self.get_changelist()
+        self.assertFalse([q for q in queries if "django_date_trunc" in q["sql"]])
+        date_filter = next(spec for spec in response.context["cl"].filter_specs if isinstance(spec, EntryDateFilter))
+        self.assertEqual([value for value, _ in date_filter.lookup_choices], ["2025", "2024"])
+
+        response = self.client.get(self.url, {"date": "2024"})
+        self.assertEqual(len(response.context["cl"].result_list), 2)
+        date_filter = next(spec for spec in response.context["cl"].filter_specs if isinstance(spec, EntryDateFilter))
+        self.assertEqual(
+            [value for value, _ in date_filter.lookup_choices],
+            ["2025", "2024", "2024-12", "2024-11", "2024-10", "2024-09", "2024-08", "2024-07", "2024-06", "2024-05", "2024-04", "2024-03"],
+        )
+
+        response = self.client.get(self.url, {"date": "2024-11"})
+        self.assertEqual([entry.date for entry in response.context["cl"].result_list], [datetime.date(2024, 11, 30)])
+
+    def test_keyset_navigation(self):
+        """
+        Testing the 'older entries' link continues below the last id shown
+        """
+        self.create_entries(EntryAdmin.list_per_page + 5)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        last_shown = self.user.entries.order_by("-id")[EntryAdmin.list_per_page - 1]
+        self.assertIn(f"id__lt={last_shown.pk}", response.context["next_cursor_url"])
+
+        response = self.client.get(self.url + response.context["next_cursor_url"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["cl"].result_list), 5)
+        self.assertNotIn("next_cursor_url", response.context)
+
+    def test_estimated_count_paginator(self):
+        """
+        Testing counts are capped, and statistics are used once they exist and exceed the cap
+        """
+        self.create_entries(12)
+        paginator = EstimatedCountPaginator(Entry.objects.using(self.db).order_by("-id"), 5)
+        self.assertEqual(paginator.count, 12)
+
+        paginator = EstimatedCountPaginator(Entry.objects.using(self.db).filter(current_mood="happy").order_by("-id"), 5)
+        paginator.count_limit = 10
+        self.assertEqual(paginator.count, 10)
+
+        with connections[self.db].cursor() as cursor:
+            cursor.execute("ANALYZE")
+        self.assertEqual(estimate_row_count(Entry.objects.using(self.db)), 12)
+        paginator = EstimatedCountPaginator(Entry.objects.using(self.db).order_by("-id"), 5)
+        paginator.count_limit = 10
+        self.assertEqual(paginator.count, 12)
+
+    def test_delete_in_chunks(self):
+        """
+        Testing the chunked delete action removes only the selected entries
+        """
+        self.create_entries(7)
+        self.assertEqual([len(pks) for pks in chunked_pks(self.user.entries.all(), size=3)], [3, 3, 1])
+
+        keep = self.user.entries.order_by("id").first()
+        selected = self.user.entries.exclude(pk=keep.pk).values_list("pk", flat=True)
+        data = {
+            "action": "delete_in_chunks",
+            "_selected_action": [str(pk) for pk in selected],
+            }
+
+        # Confirmation page first, nothing deleted yet
+        response = self.client.post(self.url, data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["count"], 6)
+        self.assertEqual(self.user.entries.count(), 7)
+
+        response = self.client.post(self.url, {**data, "post": "yes"})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(list(self.user.entries.values_list("pk", flat=True)), [keep.pk])
+        self.assertEqual(LogEntry.objects.filter(action_flag=DELETION).count(), 6)
+
+
+@override_settings(ENTRY_SHARDS=2)
+class ShardedEntryAdminTest(TestCase):
+    # Configured by minilog.test_settings
+    databases = {"default", "entries_0", "entries_1"}
+
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(username="admin", email="admin@gmail.com", password="admin_123")
+        self.user = User.objects.create_user(username="simba", email="simba@gmail.com", password="simba_123")
+        # Not the first shard, which the admin falls back to
+        EntryShard.objects.create(user=self.user, shard=1)
+        self.client.force_login(self.admin_user)
+        self.data = {"user": self.user.pk, "title": "Title", "content": "Content", "current_mood": "happy"}
+
+    def test_add_change_delete(self):
+        """
+        Testing the add, change and delete forms write to the entry's shard
+        """
+        response = self.client.post(reverse("admin:api_entry_add"), self.data)
+        self.assertEqual(response.status_code, 302)
+        entry = Entry.objects.using("entries_1").get()
+        self.assertFalse(Entry.objects.using("entries_0").exists())
+
+        change_url = reverse("admin:api_entry_change", args=[entry.pk])
+        self.assertEqual(self.client.get(change_url).status_code, 200)
+        response = self.client.post(change_url, {**self.data, "title": "Updated"})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.user.entries.get().title, "Updated")
+
+        delete_url = reverse("admin:api_entry_delete", args=[entry.pk])
+        self.assertEqual(self.client.get(delete_url).status_code, 200)
+        response = self.client.post(delete_url, {"post": "yes"})
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(self.user.entries.exists())
+
+    def test_add_while_moving(self):
+        """
+        Testing an add is refused with a message while the user's entries are being moved
+        """
+        EntryShard.objects.filter(user=self.user).update(moving=True)
+        response = self.client.post(reverse("admin:api_entry_add"), self.data, follow=True)
+        self.assertContains(response, "being moved")
+        self.assertFalse(self.user.entries.exists())
+
+    def test_add_invalid(self):
+        """
+        Testing an add without a valid user shows the form errors instead of failing
+        """
+        response = self.client.post(reverse("admin:api_entry_add"), {**self.data, "user": "nobody"})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context["adminform"].form.errors)
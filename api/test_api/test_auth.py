@@ -4,6 +4,8 @@ from django.contrib.auth.models import User
 from django.urls import reverse
 
 class JWTAthenticationTest(APITestCase):
+    databases = "__all__"
+
     def setUp(self):
         self.register_url = reverse("register")
         self.login_url = reverse("token_obtain_pair")
@@ -0,0 +1,119 @@
+import datetime
+import tempfile
+from unittest import mock
+from django.contrib.auth.models import User
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.test import SimpleTestCase
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+from django.urls import reverse
+from ..cache import FileCache
+from ..calendar import calendar_cache_key, get_calendar, invalidate_calendar
+from ..models import Entry
+
+class CalendarTest(APITestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        caches["calendar"].clear()
+        self.user = User.objects.create_user(username="simba", email="simba@gmail.com", password="simba_123")
+        self.other = User.objects.create_user(username="fabrice", email="fabrice@gmail.com", password="fabrice_123")
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+        self.url = reverse("entry-calendar")
+
+    def create_entry(self, user, date, current_mood):
+        entry = Entry.objects.create(user=user, title="Title", content="Content", current_mood=current_mood)
+        # date is auto_now_add, so move it afterwards
+        user.entries.filter(pk=entry.pk).update(date=date)
+        return entry
+
+    def test_calendar_counts_and_dominant_mood(self):
+        """
+        Testing per-day counts and dominant mood, scoped to the user and year
+        """
+        self.create_entry(self.user, datetime.date(2025, 3, 1), "happy")
+        self.create_entry(self.user, datetime.date(2025, 3, 1), "sad")
+        self.create_entry(self.user, datetime.date(2025, 3, 1), "sad")
+        self.create_entry(self.user, datetime.date(2025, 3, 2), "neutral")
+        self.create_entry(self.user, datetime.date(2024, 3, 1), "happy")
+        self.create_entry(self.other, datetime.date(2025, 3, 1), "happy")
+
+        with CaptureQueriesContext(connections[self.user.entries.all().db]) as queries:
+            response = self.client.get(self.url, {"year": 2025})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len([q for q in queries if "api_entry" in q["sql"]]), 1)
+        self.assertEqual(response.data["year"], 2025)
+        self.assertEqual(response.data["days"], [
+            {"date": "2025-03-01", "count": 3, "dominant_mood": "sad"},
+            {"date": "2025-03-02", "count": 1, "dominant_mood": "neutral"},
+            ])
+
+    def test_calendar_invalid_year(self):
+        """
+        Testing a non-numeric year gets 400 and unauthenticated users get 401
+        """
+        response = self.client.get(self.url, {"year": "abc"})
+        self.assertEqual(response.status_code, 400)
+
+        self.client.credentials()
+        response = self.client.get(self.url, {"year": 2025})
+        self.assertEqual(response.status_code, 401)
+
+    def test_calendar_cache_invalidated_on_write(self):
+        """
+        Testing the cached calendar is dropped when an entry in that year is written
+        """
+        year = datetime.date.today().year
+        response = self.client.get(self.url, {"year": year})
+        self.assertEqual(response.data["days"], [])
+
+        with CaptureQueriesContext(connections[self.user.entries.all().db]) as queries:
+            self.client.get(self.url, {"year": year})
+        self.assertFalse([q for q in queries if "api_entry" in q["sql"]])
+
+        data = {
+                "title": "My First Entry",
+                "current_mood": "happy",
+                "content": "Today I'm testing the calendar."
+                }
+        with self.captureOnCommitCallbacks(using=self.user.entries.all().db, execute=True):
+            create = self.client.post(reverse("entry-list"), data)
+        self.assertEqual(create.status_code, 201)
+        response = self.client.get(self.url, {"year": year})
+        self.assertEqual(len(response.data["days"]), 1)
+
+        with self.captureOnCommitCallbacks(using=self.user.entries.all().db, execute=True):
+            delete = self.client.delete(reverse("entry-detail", kwargs={"pk": create.data["id"]}))
+        self.assertEqual(delete.status_code, 204)
+        response = self.client.get(self.url, {"year": year})
+        self.assertEqual(response.data["days"], [])
+
+    def test_calendar_built_before_write_not_served(self):
+        """
+        Testing a calendar cached by a read that raced a write is not served after the write
+        """
+        stale_key = calendar_cache_key(self.user.pk, 2025)
+        invalidate_calendar(self.user.pk, 2025)
+        caches["calendar"].set(stale_key, [{"date": "2025-01-01", "count": 9, "dominant_mood": "sad"}])
+        self.assertEqual(get_calendar(self.user, 2025), [])
+
+
+class FileCacheTest(SimpleTestCase):
+    def test_cull_interval(self):
+        """
+        Testing the file cache lists its directory once every CULL_INTERVAL sets, and still culls
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            file_cache = FileCache(directory, {"OPTIONS": {"MAX_ENTRIES": 2, "CULL_INTERVAL": 3}})
+            with mock.patch.object(
+                FileCache, "_list_cache_files", autospec=True, side_effect=FileBasedCache._list_cache_files
+            ) as listed:
+                for i in range(6):
+                    file_cache.set(f"key-{i}", i)
+            self.assertEqual(listed.call_count, 2)
+            self.assertLess(len(file_cache._list_cache_files()), 6)
@@ -0,0 +1,185 @@
+import asyncio
+import json
+import socket
+import tempfile
+import time
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+from ..events import EVENT_TITLE_LENGTH, MAX_DATAGRAM, EventBus, UserHistory, entry_event, publish
+from ..models import Entry
+from ..sse import EntryEventsApp
+
+class EntryEventsTest(TestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.bus = EventBus(directory=self.directory.name)
+        self.user = User.objects.create_user(username="simba", email="simba@gmail.com", password="simba_123")
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+
+    def tearDown(self):
+        self.bus.stop()
+        self.directory.cleanup()
+
+    def event(self, event_id, event_type="created"):
+        return {"id": event_id, "user": self.user.id, "type": event_type, "entry": {"id": 1}}
+
+    async def connect(self, headers=(), query=b""):
+        """
+        Start the SSE app and return its task, sent messages and a way to disconnect.
+        """
+        messages = []
+        incoming = asyncio.Queue()
+        scope = {"type": "http", "method": "GET", "path": "/api/entries/events/",
+                 "headers": list(headers), "query_string": query}
+
+        async def send(message):
+            messages.append(message)
+
+        with mock.patch("api.sse.bus", self.bus):
+            task = asyncio.ensure_future(EntryEventsApp()(scope, incoming.get, send))
+            await asyncio.sleep(0.05)
+        return task, messages, lambda: incoming.put_nowait({"type": "http.disconnect"})
+
+    def body(self, messages):
+        return b"".join(message.get("body", b"") for message in messages if message["type"] == "http.response.body")
+
+    def test_requires_token(self):
+        """
+        Testing connecting without a valid token gets 401
+        """
+        async def scenario():
+            task, messages, _ = await self.connect(query=b"token=invalid")
+            await task
+            return messages
+
+        messages = asyncio.run(scenario())
+        self.assertEqual(messages[0]["status"], 401)
+
+    def test_stream_events(self):
+        """
+        Testing events published on the bus reach the user's stream
+        """
+        async def scenario():
+            self.bus.start()
+            task, messages, disconnect = await self.connect(query=f"token={self.token}".encode())
+            publish(self.event(self.bus.horizon + 1), directory=self.directory.name)
+            publish({**self.event(self.bus.horizon + 2), "user": self.user.id + 1}, directory=self.directory.name)
+            await asyncio.sleep(0.1)
+            disconnect()
+            await task
+            return messages
+
+        messages = asyncio.run(scenario())
+        self.assertEqual(messages[0]["status"], 200)
+        self.assertIn((b"content-type", b"text/event-stream"), messages[0]["headers"])
+        body = self.body(messages).decode()
+        self.assertIn(f'id: {self.bus.horizon + 1}\nevent: created\ndata: {{"id":1}}\n\n', body)
+        self.assertNotIn(str(self.bus.horizon + 2), body)
+
+    def test_resume_with_last_event_id(self):
+        """
+        Testing reconnecting replays missed events, or asks for a reset when they are unknown
+        """
+        async def scenario():
+            self.bus.start()
+            first, second = self.event(self.bus.horizon + 1), self.event(self.bus.horizon + 2, "deleted")
+            publish(first, directory=self.directory.name)
+            publish(second, directory=self.directory.name)
+            await asyncio.sleep(0.05)
+
+            bodies = []
+            for last_id in (first["id"], self.bus.horizon - 1):
+                task, messages, disconnect = await self.connect(
+                    headers=[(b"authorization", f"Bearer {self.token}".encode()),
+                             (b"last-event-id", str(last_id).encode())])
+                disconnect()
+                await task
+                bodies.append(self.body(messages).decode())
+            return first, second, bodies
+
+        first, second, (resumed, reset) = asyncio.run(scenario())
+        self.assertIn(f"id: {second['id']}\nevent: deleted", resumed)
+        self.assertNotIn(f"id: {first['id']}\n", resumed)
+        self.assertIn("event: reset", reset)
+
+    def test_resume_from_before_start(self):
+        """
+        Testing a resume from before the worker started listening asks for a reset
+        """
+        async def scenario():
+            missed = self.event(time.time_ns())
+            publish(missed, directory=self.directory.name)
+            self.bus.start()
+            task, messages, disconnect = await self.connect(
+                headers=[(b"authorization", f"Bearer {self.token}".encode()),
+                         (b"last-event-id", str(missed["id"] - 1).encode())])
+            disconnect()
+            await task
+            return self.body(messages).decode()
+
+        self.assertIn("event: reset", asyncio.run(scenario()))
+
+    def test_out_of_order_events(self):
+        """
+        Testing an event arriving after a newer one is kept in id order and resets resumes past it
+        """
+        history = UserHistory(horizon=0)
+        for event_id in (10, 30, 20):
+            history.append(self.event(event_id))
+        self.assertEqual([event["id"] for event in history.events], [10, 20, 30])
+        self.assertIsNone(history.since(30))
+        self.assertIsNone(history.since(15))
+
+        history.append(self.event(40))
+        self.assertEqual([event["id"] for event in history.since(31)], [40])
+
+    def test_unreadable_datagram_resets_resumes(self):
+        """
+        Testing a datagram that cannot be decoded makes earlier resumes get a reset
+        """
+        async def scenario():
+            self.bus.start()
+            event = self.event(self.bus.horizon + 1)
+            publish(event, directory=self.directory.name)
+            await asyncio.sleep(0.05)
+            _, before = self.bus.subscribe(self.user.id, event["id"])
+            with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+                sock.sendto(b'{"id": 1, "user": ', self.bus.path)
+            await asyncio.sleep(0.05)
+            _, after = self.bus.subscribe(self.user.id, event["id"])
+            return before, after
+
+        before, after = asyncio.run(scenario())
+        self.assertEqual(before, [])
+        self.assertIsNone(after)
+
+    def test_long_title_capped(self):
+        """
+        Testing an entry with a huge title still makes an event that fits a datagram
+        """
+        entry = Entry(pk=1, user=self.user, title="x" * (MAX_DATAGRAM * 2), content="Content", current_mood="happy")
+        event = entry_event("updated", entry)
+        self.assertEqual(len(event["entry"]["title"]), EVENT_TITLE_LENGTH)
+        self.assertLess(len(json.dumps(event)), MAX_DATAGRAM)
+
+    def test_writes_publish_events(self):
+        """
+        Testing entry writes publish compact events once committed
+        """
+        db = self.user.entries.all().db
+        with mock.patch("api.signals.publish") as published:
+            with self.captureOnCommitCallbacks(using=db, execute=True):
+                entry = Entry.objects.create(user=self.user, title="Title", content="Content", current_mood="happy")
+            with self.captureOnCommitCallbacks(using=db, execute=True):
+                entry.delete()
+
+        created, deleted = [call.args[0] for call in published.call_args_list]
+        self.assertEqual(created["type"], "created")
+        self.assertEqual(created["user"], self.user.id)
+        self.assertNotIn("content", created["entry"])
+        self.assertEqual(deleted["type"], "deleted")
+        self.assertEqual(deleted["entry"], {"id": created["entry"]["id"]})
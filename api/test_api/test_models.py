@@ -5,6 +5,8 @@ from ..models import Entry
 from django.urls import reverse
 
 class EntryCreateTest(APITestCase):
+    databases = "__all__"
+
     def setUp(self):
         self.user = User.objects.create_user(username="john", email="john@gmail.com", password="john_123")
         token = RefreshToken.for_user(self.user).access_token
@@ -89,7 +91,7 @@ class EntryCreateTest(APITestCase):
         response = self.client.post(self.url, data)
         self.assertEqual(response.status_code, 201)
 
-        entry = Entry.objects.first()
+        entry = self.user.entries.first()
         expected_str = f"{entry.title} - {entry.date}"
         self.assertEqual(str(entry), expected_str)
 
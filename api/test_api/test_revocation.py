@@ -0,0 +1,115 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+from django.urls import reverse
+from datetime import timedelta
+from django.utils import timezone
+from ..models import TokenRevocation
+from ..revocation import BloomFilter, revocation_list
+
+class RevocationTest(APITestCase):
+    def setUp(self):
+        revocation_list.reset()
+        self.user = User.objects.create_user(username="simba", email="simba@gmail.com", password="simba_123")
+        self.refresh_url = reverse("token_refresh")
+        self.logout_url = reverse("logout")
+        self.logout_all_url = reverse("logout_all")
+
+    def login(self, refresh):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+
+    def test_bloom_filter(self):
+        """
+        Testing added keys are always found
+        """
+        bloom = BloomFilter(bits=1024, hashes=3)
+        keys = [f"jti:{i}" for i in range(50)]
+        for key in keys:
+            bloom.add(key)
+        self.assertTrue(all(key in bloom for key in keys))
+
+    def test_refresh_without_revocation_lookup(self):
+        """
+        Testing a non-revoked refresh token is accepted without querying revocations
+        """
+        refresh = RefreshToken.for_user(self.user)
+        revocation_list.refresh(force=True)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.refresh_url, {"refresh": str(refresh)})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("access", response.data)
+        self.assertFalse([q for q in queries if "api_tokenrevocation" in q["sql"]])
+
+    def test_logout(self):
+        """
+        Testing a logged out refresh token can no longer be used, and other sessions still can
+        """
+        refresh = RefreshToken.for_user(self.user)
+        other = RefreshToken.for_user(self.user)
+        self.login(refresh)
+
+        response = self.client.post(self.logout_url, {"refresh": str(refresh)})
+        self.assertEqual(response.status_code, 204)
+
+        self.client.credentials()
+        response = self.client.post(self.refresh_url, {"refresh": str(refresh)})
+        self.assertEqual(response.status_code, 401)
+        response = self.client.post(self.refresh_url, {"refresh": str(other)})
+        self.assertEqual(response.status_code, 200)
+
+        # Logging out again does not add another row
+        self.login(refresh)
+        response = self.client.post(self.logout_url, {"refresh": str(refresh)})
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(TokenRevocation.objects.count(), 1)
+        self.client.credentials()
+
+        # Another worker sees the revocation once it refreshes its filter
+        revocation_list.reset()
+        response = self.client.post(self.refresh_url, {"refresh": str(refresh)})
+        self.assertEqual(response.status_code, 401)
+
+    def test_logout_other_users_token(self):
+        """
+        Testing a user cannot revoke someone else's refresh token, and bad tokens get 401
+        """
+        other_user = User.objects.create_user(username="fabrice", email="fabrice@gmail.com", password="fabrice_123")
+        self.login(RefreshToken.for_user(self.user))
+
+        response = self.client.post(self.logout_url, {"refresh": str(RefreshToken.for_user(other_user))})
+        self.assertEqual(response.status_code, 403)
+        response = self.client.post(self.logout_url, {"refresh": "not-a-token"})
+        self.assertEqual(response.status_code, 401)
+
+    def test_logout_all(self):
+        """
+        Testing revoking all sessions rejects every refresh token issued before it
+        """
+        first = RefreshToken.for_user(self.user)
+        second = RefreshToken.for_user(self.user)
+        self.login(first)
+
+        response = self.client.post(self.logout_all_url)
+        self.assertEqual(response.status_code, 204)
+
+        self.client.credentials()
+        for refresh in (first, second):
+            response = self.client.post(self.refresh_url, {"refresh": str(refresh)})
+            self.assertEqual(response.status_code, 401)
+
+        # Unauthenticated users get 401
+        response = self.client.post(self.logout_all_url)
+        self.assertEqual(response.status_code, 401)
+
+    def test_expired_revocations_pruned(self):
+        """
+        Testing rebuilding the filter deletes revocations whose tokens have expired
+        """
+        TokenRevocation.objects.create(key="jti:old", user=self.user, expires_at=timezone.now() - timedelta(seconds=1))
+        live = TokenRevocation.objects.create(key="jti:new", user=self.user, expires_at=timezone.now() + timedelta(days=1))
+
+        revocation_list.refresh(force=True)
+        self.assertEqual(list(TokenRevocation.objects.values_list("pk", flat=True)), [live.pk])
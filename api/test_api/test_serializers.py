@@ -4,6 +4,8 @@ from ..models import Entry
 from django.contrib.auth.models import User
 
 class SerializerTest(APITestCase):
+    databases = "__all__"
+
     def setUp(self):
         self.user = User.objects.create_user(username="john", email="john@gmail.com", password="john_123")
 
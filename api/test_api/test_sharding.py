@@ -0,0 +1,205 @@
+import datetime
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+from django.urls import reverse
+from ..models import Entry, EntryIdBlock, EntryShard
+from ..routers import EntryShardRouter
+from .. import sharding
+from ..sharding import ShardMoving, ShardRoutingError, entry_write, home_shard, move_user, shard_alias
+
+class RouterTest(SimpleTestCase):
+    def setUp(self):
+        self.router = EntryShardRouter()
+
+    @override_settings(ENTRY_SHARDS=2)
+    def test_allow_migrate(self):
+        """
+        Testing only Entry is created on shard databases
+        """
+        self.assertTrue(self.router.allow_migrate("entries_0", "api", "entry"))
+        self.assertFalse(self.router.allow_migrate("entries_1", "api", "entryshard"))
+        self.assertFalse(self.router.allow_migrate("entries_1", "auth", "user"))
+        self.assertFalse(self.router.allow_migrate("default", "api", "entry"))
+        self.assertIsNone(self.router.allow_migrate("default", "api", "entryshard"))
+        self.assertEqual(home_shard(5), 1)
+
+    @override_settings(ENTRY_SHARDS=2)
+    def test_query_without_user_raises(self):
+        """
+        Testing an Entry query that cannot be tied to a user raises instead of using the default database
+        """
+        with self.assertRaises(ShardRoutingError):
+            self.router.db_for_read(Entry)
+        with self.assertRaises(ShardRoutingError):
+            self.router.db_for_write(Entry, instance=Entry())
+        self.assertEqual(self.router.db_for_read(User), "default")
+
+    @override_settings(ENTRY_SHARDS=0)
+    def test_sharding_disabled(self):
+        """
+        Testing the router leaves everything to the default database without shards
+        """
+        self.assertIsNone(self.router.db_for_read(Entry))
+        self.assertIsNone(self.router.db_for_write(Entry))
+        self.assertIsNone(self.router.allow_migrate("default", "api", "entry"))
+
+
+@override_settings(ENTRY_SHARDS=2)
+class ShardedEntriesTest(APITestCase):
+    # Configured by minilog.test_settings
+    databases = {"default", "entries_0", "entries_1"}
+
+    def setUp(self):
+        self.user1 = User.objects.create_user(username="simba", email="simba@gmail.com", password="simba_123")
+        self.user2 = User.objects.create_user(username="fabrice", email="fabrice@gmail.com", password="fabrice_123")
+        EntryShard.objects.create(user=self.user1, shard=0)
+        EntryShard.objects.create(user=self.user2, shard=1)
+
+        self.data = {
+                "title": "My First Entry",
+                "current_mood": "neutral",
+                "content": "Today I'm testing my shards."
+                }
+        self.list_url = reverse("entry-list")
+
+    def login(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(user).access_token}")
+
+    def test_entries_routed_to_user_shard(self):
+        """
+        Testing each user's entries are written to and read from their own shard
+        """
+        self.login(self.user1)
+        first = self.client.post(self.list_url, self.data)
+        self.assertEqual(first.status_code, 201)
+        self.login(self.user2)
+        second = self.client.post(self.list_url, self.data)
+        self.assertEqual(second.status_code, 201)
+
+        self.assertNotEqual(first.data["id"], second.data["id"])
+        self.assertEqual(list(Entry.objects.using("entries_0").values_list("user_id", flat=True)), [self.user1.id])
+        self.assertEqual(list(Entry.objects.using("entries_1").values_list("user_id", flat=True)), [self.user2.id])
+        with self.assertRaises(ShardRoutingError):
+            Entry.objects.filter(user=self.user1).count()
+
+        response = self.client.get(self.list_url)
+        self.assertEqual([entry["id"] for entry in response.data], [second.data["id"]])
+        detail_url = reverse("entry-detail", kwargs={"pk": second.data["id"]})
+        response = self.client.put(detail_url, {**self.data, "title": "Updated"})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(reverse("entry-calendar"), {"year": datetime.date.today().year})
+        self.assertEqual(response.data["days"][0]["count"], 1)
+        self.assertEqual(self.client.delete(detail_url).status_code, 204)
+        self.assertFalse(Entry.objects.using("entries_1").exists())
+
+    def test_move_user(self):
+        """
+        Testing moving a user keeps entry ids and dates and the API follows the move
+        """
+        entries = [Entry.objects.create(user=self.user1, title=f"Entry {i}", content="Content", current_mood="happy")
+                   for i in range(3)]
+        self.user1.entries.filter(pk=entries[0].pk).update(date=datetime.date(2024, 1, 1))
+
+        self.assertEqual(move_user(self.user1.id, 1, chunk_size=2), 3)
+
+        self.assertFalse(Entry.objects.using("entries_0").exists())
+        moved = Entry.objects.using("entries_1").filter(user=self.user1).order_by("pk")
+        self.assertEqual([entry.pk for entry in moved], [entry.pk for entry in entries])
+        self.assertEqual(moved[0].date, datetime.date(2024, 1, 1))
+        self.assertEqual(EntryShard.objects.get(user=self.user1).shard, 1)
+
+        self.login(self.user1)
+        response = self.client.get(self.list_url)
+        self.assertEqual(len(response.data), 3)
+
+    def test_write_rolled_back_when_moved_meanwhile(self):
+        """
+        Testing a write that passed the moving check is rolled back if the user was moved before it committed
+        """
+        with self.assertRaises(ShardMoving):
+            with entry_write(self.user1):
+                Entry.objects.create(user=self.user1, title="Late", content="Content", current_mood="sad")
+                # move_user switching the assignment while the write was in flight
+                EntryShard.objects.filter(user=self.user1).update(shard=1)
+        self.assertFalse(Entry.objects.using("entries_0").exists())
+
+    def test_drain_entries(self):
+        """
+        Testing entries stored outside a user's shard are moved there by --drain
+        """
+        stray = Entry(user=self.user1, title="Stray", content="Content", current_mood="happy")
+        stray.save(using="entries_1")
+
+        call_command("rebalance_entry_shards", "--drain", "entries_1", stdout=open("/dev/null", "w"))
+        self.assertEqual(list(Entry.objects.using("entries_0").values_list("pk", flat=True)), [stray.pk])
+        self.assertFalse(Entry.objects.using("entries_1").exists())
+
+    def test_id_counter_created_concurrently(self):
+        """
+        Testing a worker that loses the race to create the id counter takes the next block instead of failing
+        """
+        first_entry_id = sharding._first_entry_id
+
+        def other_worker_first():
+            start = first_entry_id()
+            EntryIdBlock.objects.create(pk=1, next_id=start + sharding.ID_BLOCK_SIZE)
+            return start
+
+        allocator = sharding.EntryIdAllocator()
+        with mock.patch("api.sharding._first_entry_id", side_effect=other_worker_first):
+            entry_id = allocator()
+        self.assertEqual(EntryIdBlock.objects.get(pk=1).next_id, entry_id + sharding.ID_BLOCK_SIZE)
+        self.assertEqual(entry_id, first_entry_id() + sharding.ID_BLOCK_SIZE)
+
+    def test_writes_refused_while_moving(self):
+        """
+        Testing writes get 503 while the user's entries are being moved
+        """
+        EntryShard.objects.filter(user=self.user1).update(moving=True)
+        self.login(self.user1)
+        response = self.client.post(self.list_url, self.data)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(self.client.get(self.list_url).status_code, 200)
+
+    def test_rebalance_command(self):
+        """
+        Testing --all moves users back to their home shard
+        """
+        Entry.objects.create(user=self.user1, title="Title", content="Content", current_mood="sad")
+        EntryShard.objects.filter(user=self.user1).update(shard=1 - home_shard(self.user1.id))
+        Entry.objects.using(shard_alias(0)).filter(user=self.user1).delete()
+
+        call_command("rebalance_entry_shards", "--all", stdout=open("/dev/null", "w"))
+        self.assertEqual(EntryShard.objects.get(user=self.user1).shard, home_shard(self.user1.id))
+
+    def test_shrink_shards(self):
+        """
+        Testing lowering ENTRY_SHARDS keeps retired shards readable until --all drains them, and is refused without them
+        """
+        Entry.objects.create(user=self.user2, title="Title", content="Content", current_mood="sad")
+        out = open("/dev/null", "w")
+
+        with override_settings(ENTRY_SHARDS=1, ENTRY_SHARDS_RETIRED=0):
+            with self.assertRaisesMessage(CommandError, "ENTRY_SHARDS_RETIRED=2"):
+                call_command("rebalance_entry_shards", "--all", stdout=out)
+
+        with override_settings(ENTRY_SHARDS=1, ENTRY_SHARDS_RETIRED=2):
+            self.login(self.user2)
+            self.assertEqual(len(self.client.get(self.list_url).data), 1)
+            call_command("rebalance_entry_shards", "--all", stdout=out)
+
+        self.assertEqual(EntryShard.objects.get(user=self.user2).shard, 0)
+        self.assertEqual(list(Entry.objects.using("entries_0").values_list("user_id", flat=True)), [self.user2.id])
+        self.assertFalse(Entry.objects.using("entries_1").exists())
+
+    def test_delete_user(self):
+        """
+        Testing deleting a user removes their entries from the shard
+        """
+        Entry.objects.create(user=self.user2, title="Title", content="Content", current_mood="sad")
+        self.user2.delete()
+        self.assertFalse(Entry.objects.using("entries_1").exists())
@@ -0,0 +1,21 @@
+from django.core.wsgi import get_wsgi_application
+from django.test import TestCase
+from minilog import startup
+
+class StartupTest(TestCase):
+    databases = "__all__"
+
+    def test_warm_up(self):
+        """
+        Testing warm-up runs and records its timing
+        """
+        self.assertGreaterEqual(startup.warm_up(), 0)
+        self.assertIn("warm_up", startup.timings)
+
+    def test_warm_worker(self):
+        """
+        Testing the warm-up request goes through the whole stack and gets 401 without a token
+        """
+        application = get_wsgi_application()
+        self.assertEqual(startup.warm_request(application), 401)
+        self.assertGreaterEqual(startup.warm_worker(application), 0)
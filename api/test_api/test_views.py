@@ -4,6 +4,8 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from django.urls import reverse
 
 class ViewsTest(APITestCase):
+    databases = "__all__"
+
     def setUp(self):
         self.user1 = User.objects.create_user(username="simba", email="simba@gmail.com", password="simba_123")
         self.user2 = User.objects.create_user(username="fabrice", email="fabrice@gmail.com", password="fabrice_123")
@@ -1,10 +1,20 @@
 from django.shortcuts import render
-from rest_framework import viewsets, permissions, generics
+from django.utils import timezone
+from rest_framework import viewsets, permissions, generics, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt import views as jwt_views
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
 from .models import Entry
 from django.contrib.auth.models import User
-from .serializers import EntrySerializer, RegisterSerializer
+from .serializers import EntrySerializer, RegisterSerializer, LogoutSerializer, RevocationAwareTokenRefreshSerializer
+from .calendar import get_calendar
+from .revocation import revoke_token, revoke_all
+from .sharding import entry_write
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from django.shortcuts import get_object_or_404
 
 
@@ -13,12 +23,63 @@ class EntryViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return Entry.objects.filter(user=self.request.user)
+        # The related manager carries the user as a hint for the shard router
+        return self.request.user.entries.all()
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        with entry_write(self.request.user):
+            serializer.save(user=self.request.user)
+
+    def perform_update(self, serializer):
+        with entry_write(self.request.user):
+            serializer.save()
+
+    def perform_destroy(self, instance):
+        with entry_write(self.request.user):
+            instance.delete()
+
+    @action(detail=False, methods=['get'])
+    def calendar(self, request):
+        year = request.query_params.get('year', timezone.now().year)
+        try:
+            year = int(year)
+        except (TypeError, ValueError):
+            raise ValidationError({"year": "Year must be an integer."})
+        if not 1 <= year <= 9999:
+            raise ValidationError({"year": "Year must be between 1 and 9999."})
+
+        return Response({"year": year, "days": get_calendar(request.user, year)})
 
 class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
     permission_classes = (permissions.AllowAny,)
     serializer_class = RegisterSerializer
+
+
+class TokenRefreshView(jwt_views.TokenRefreshView):
+    serializer_class = RevocationAwareTokenRefreshSerializer
+
+
+class LogoutView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = LogoutSerializer(data=request.data)
+        try:
+            serializer.is_valid(raise_exception=True)
+        except TokenError as e:
+            raise InvalidToken(e.args[0])
+
+        refresh = serializer.validated_data['refresh']
+        if str(refresh.get(api_settings.USER_ID_CLAIM)) != str(getattr(request.user, api_settings.USER_ID_FIELD)):
+            raise PermissionDenied("Token does not belong to this user.")
+        revoke_token(refresh, request.user)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class LogoutAllView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        revoke_all(request.user)
+        return Response(status=status.HTTP_204_NO_CONTENT)
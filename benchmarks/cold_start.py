@@ -0,0 +1,82 @@
+"""
+Cold start of a gunicorn worker: time from launch to the first response, and
+how long that first request itself takes.
+
+Compares the baseline (`gunicorn minilog.wsgi` with no import-time warm-up
+and connections closed after each request) with gunicorn.conf.py (preloaded
+and warmed app, persistent connections), one worker each, median of several
+runs.
+
+    python benchmarks/cold_start.py [--runs 5]
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from http.client import HTTPConnection
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+PATH = "/api/entries/"
+
+# name: (gunicorn arguments, environment overrides)
+CONFIGS = {
+    "baseline": (
+        ["minilog.wsgi:application", "--workers", "1", "--config", "/dev/null"],
+        {"MINILOG_WARM_UP": "0", "CONN_MAX_AGE": "0"},
+    ),
+    "preload+warm": (["--config", "gunicorn.conf.py", "--workers", "1"], {}),
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def first_response(args, overrides, timeout=60):
+    port = free_port()
+    env = {**os.environ, "PORT": str(port), "SECRET_KEY": os.environ.get("SECRET_KEY", "benchmark"), **overrides}
+    launched = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", *args, "--bind", f"127.0.0.1:{port}"],
+        cwd=BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - launched < timeout:
+            connection = HTTPConnection("127.0.0.1", port, timeout=timeout)
+            try:
+                sent = time.perf_counter()
+                connection.request("GET", PATH)
+                connection.getresponse().read()
+            except ConnectionRefusedError:
+                time.sleep(0.005)
+                continue
+            finally:
+                connection.close()
+            done = time.perf_counter()
+            return done - launched, done - sent
+        raise RuntimeError("gunicorn did not respond in time")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    for name, (config, overrides) in CONFIGS.items():
+        results = [first_response(config, overrides) for _ in range(args.runs)]
+        to_first = statistics.median(result[0] for result in results) * 1000
+        latency = statistics.median(result[1] for result in results) * 1000
+        print(f"{name:<13} launch to first response {to_first:7.1f} ms   first request latency {latency:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
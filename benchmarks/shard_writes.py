@@ -0,0 +1,109 @@
+"""
+Entry write throughput against the number of shard databases.
+
+Runs the same write load (a fixed number of worker processes, each creating
+entries one transaction at a time for its own users) against 1, 2 and 4
+shards, each in a fresh temporary directory, and prints entries per second.
+
+    python benchmarks/shard_writes.py [--shards 1 2 4] [--workers 8] [--writes 300]
+"""
+import argparse
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+USERS_PER_WORKER = 4
+
+
+def setup_django(directory, shards):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "minilog.settings")
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ["ENTRY_SHARDS"] = str(shards)
+    os.environ["ENTRY_SHARD_DIR"] = directory
+    sys.path.insert(0, str(BASE_DIR))
+
+    from django.conf import settings
+    settings.DATABASES["default"]["NAME"] = Path(directory) / "db.sqlite3"
+    for database in settings.DATABASES.values():
+        database.setdefault("OPTIONS", {})["timeout"] = 60
+
+    import django
+    django.setup()
+
+
+def write_entries(user_ids, writes, results):
+    from django.db import connections
+    from api.models import Entry
+
+    start = time.perf_counter()
+    for index in range(writes):
+        Entry.objects.create(
+            user_id=user_ids[index % len(user_ids)],
+            title=f"Entry {index}",
+            content="Benchmark entry",
+            current_mood="neutral",
+        )
+    results.put(time.perf_counter() - start)
+    connections.close_all()
+
+
+def run(shards, workers, writes):
+    with tempfile.TemporaryDirectory() as directory:
+        setup_django(directory, shards)
+        from django.contrib.auth.models import User
+        from django.core.management import call_command
+        from django.db import connections
+        from api.models import EntryShard
+
+        call_command("migrate", run_syncdb=True, verbosity=0)
+        call_command("migrate_shards", run_syncdb=True, verbosity=0)
+
+        User.objects.bulk_create(User(username=f"user{i}") for i in range(workers * USERS_PER_WORKER))
+        user_ids = list(User.objects.order_by("pk").values_list("pk", flat=True))
+        EntryShard.objects.bulk_create(EntryShard(user_id=pk, shard=i % shards) for i, pk in enumerate(user_ids))
+        connections.close_all()
+
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=write_entries, args=(user_ids[worker::workers], writes, results))
+            for worker in range(workers)
+        ]
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+        total = workers * writes
+        print(f"shards={shards:<3} workers={workers:<3} entries={total:<6} "
+              f"time={elapsed:7.2f}s  throughput={total / elapsed:8.1f} entries/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--writes", type=int, default=300, help="Entries created by each worker.")
+    parser.add_argument("--run", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run is not None:
+        run(args.run, args.workers, args.writes)
+        return
+
+    # Each shard count runs in its own interpreter, since settings are read once
+    for shards in args.shards:
+        subprocess.run(
+            [sys.executable, __file__, "--run", str(shards), "--workers", str(args.workers), "--writes", str(args.writes)],
+            check=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Gunicorn config for minilog: `gunicorn -c gunicorn.conf.py` (picked up
+automatically from the project directory).
+
+The app is preloaded in the master and forked into workers, which then open
+their database connections and serve one warm-up request before accepting
+traffic. Set GUNICORN_PRELOAD=0 to load the app in each worker instead.
+Workers keep database connections open for CONN_MAX_AGE seconds (60 unless
+set) so the warmed ones are reused.
+"""
+
+import os
+import time
+
+os.environ.setdefault('CONN_MAX_AGE', '60')
+
+wsgi_app = 'minilog.wsgi:application'
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') != '0'
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '0'))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', '0'))
+
+_started = time.perf_counter()
+
+
+def when_ready(server):
+    if preload_app:
+        from minilog import startup
+        startup.close_connections()
+        server.log.info(
+            "App preloaded: import %.1f ms, warm-up %.1f ms, ready %.1f ms after start",
+            startup.timings.get('import', 0),
+            startup.timings.get('warm_up', 0),
+            (time.perf_counter() - _started) * 1000,
+        )
+
+
+def pre_fork(server, worker):
+    if preload_app:
+        from minilog import startup
+        startup.close_connections()
+
+
+def post_worker_init(worker):
+    from minilog import startup
+    startup.warm_worker(worker.wsgi)
+    worker.log.info(
+        "Worker %s warm: import %.1f ms, warm-up %.1f ms, worker warm-up %.1f ms",
+        worker.pid,
+        startup.timings.get('import', 0),
+        startup.timings.get('warm_up', 0),
+        startup.timings.get('worker_warm_up', 0),
+    )
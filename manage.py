@@ -6,6 +6,9 @@ import sys
 
 def main():
     """Run administrative tasks."""
+    if sys.argv[1:2] == ['test']:
+        # The suite needs the shard databases declared there
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'minilog.test_settings')
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'minilog.settings')
     try:
         from django.core.management import execute_from_command_line
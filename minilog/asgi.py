@@ -2,6 +2,8 @@
 ASGI config for minilog project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Server-sent entry events (/api/entries/events/) are served here directly
+rather than through Django, since streams stay open for a long time.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -13,4 +15,14 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'minilog.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from api.sse import entry_events  # noqa: E402  needs settings loaded
+
+ENTRY_EVENTS_PATH = '/api/entries/events/'
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and scope['path'] == ENTRY_EVENTS_PATH:
+        return await entry_events(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 import environ
 import os
+import tempfile
 
 env = environ.Env()
 
@@ -97,12 +98,71 @@ WSGI_APPLICATION = 'minilog.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Connections are closed after each request unless CONN_MAX_AGE is set;
+# gunicorn.conf.py sets it so the ones opened during worker warm-up are reused.
+CONN_MAX_AGE = env.int('CONN_MAX_AGE', default=0)
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+    }
+}
+
+# Entries can be spread over ENTRY_SHARDS extra SQLite databases, one writer
+# lock each. Users are assigned to a shard on first use (see api/sharding.py).
+# Create the shard tables with `python manage.py migrate_shards`.
+ENTRY_SHARDS = env.int('ENTRY_SHARDS', default=0)
+# When lowering ENTRY_SHARDS, set this to the old value: the shards above the
+# new count stay configured so `rebalance_entry_shards --all` can empty them.
+ENTRY_SHARDS_RETIRED = env.int('ENTRY_SHARDS_RETIRED', default=0)
+ENTRY_SHARD_DIR = Path(env('ENTRY_SHARD_DIR', default=str(BASE_DIR)))
+
+
+def entry_shard_database(index):
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ENTRY_SHARD_DIR / f'db_entries_{index}.sqlite3',
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
     }
+
+
+for index in range(max(ENTRY_SHARDS, ENTRY_SHARDS_RETIRED)):
+    DATABASES[f'entries_{index}'] = entry_shard_database(index)
+
+DATABASE_ROUTERS = ['api.routers.EntryShardRouter']
+
+# Each ASGI worker binds a datagram socket here to receive entry events for
+# /api/entries/events/. All workers, WSGI included, must share the directory.
+EVENT_BUS_DIR = env('EVENT_BUS_DIR', default=os.path.join(tempfile.gettempdir(), 'minilog-events'))
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# The default file cache is shared by all workers on a host, so cache
+# invalidation reaches every one of them. Set CACHE_URL (e.g. rediscache://)
+# when workers run on several hosts.
+
+CACHES = {
+    'default': env.cache(
+        'CACHE_URL',
+        default=f"filecache://{os.path.join(tempfile.gettempdir(), 'minilog-cache')}",
+    ),
+    # Calendars take two keys (a version and the data) per user and year
+    'calendar': env.cache(
+        'CALENDAR_CACHE_URL',
+        default=f"filecache://{os.path.join(tempfile.gettempdir(), 'minilog-calendar')}",
+    ),
 }
+CACHES['calendar'].setdefault('OPTIONS', {}).setdefault(
+    'MAX_ENTRIES', env.int('CALENDAR_CACHE_MAX_ENTRIES', default=100000)
+)
+# The stock file cache lists its whole directory on every set
+if CACHES['calendar']['BACKEND'] == 'django.core.cache.backends.filebased.FileBasedCache':
+    CACHES['calendar']['BACKEND'] = 'api.cache.FileCache'
 
 
 # Password validation
@@ -0,0 +1,84 @@
+"""
+Warm-up helpers for minilog/wsgi.py and gunicorn.conf.py.
+
+Work that Django would otherwise do on a worker's first live request
+(URL resolver, serializer and model introspection, JWT backend, database
+connections) is done here up front, and timed so deploys can report it.
+"""
+
+import time
+from wsgiref.util import setup_testing_defaults
+
+# Filled in by minilog.wsgi and warm_worker(), in milliseconds
+timings = {}
+
+WARM_UP_PATH = '/api/entries/'
+
+
+def warm_up():
+    """
+    Build everything that does not need a database connection, so it can run
+    in the gunicorn master before workers are forked.
+    """
+    start = time.perf_counter()
+
+    from django.urls import get_resolver, resolve, reverse
+    get_resolver().reverse_dict
+    resolve(reverse('entry-list'))
+
+    from api import serializers
+    for serializer_class in (serializers.EntrySerializer, serializers.RegisterSerializer):
+        serializer_class().fields
+
+    from rest_framework_simplejwt.tokens import AccessToken
+    str(AccessToken())
+
+    timings['warm_up'] = (time.perf_counter() - start) * 1000
+    return timings['warm_up']
+
+
+def close_connections():
+    """
+    Close database connections before forking; a child must never reuse its
+    parent's connection.
+    """
+    from django.db import connections
+    connections.close_all()
+
+
+def connect_databases():
+    from django.db import connections
+    for connection in connections.all():
+        connection.ensure_connection()
+
+
+def warm_request(application, path=WARM_UP_PATH):
+    """
+    Send one unauthenticated request through the full middleware and view stack.
+    """
+    environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': path}
+    setup_testing_defaults(environ)
+    status = []
+
+    def start_response(status_line, headers, exc_info=None):
+        status.append(int(status_line.split()[0]))
+
+    response = application(environ, start_response)
+    try:
+        for _ in response:
+            pass
+    finally:
+        if hasattr(response, 'close'):
+            response.close()
+    return status[0]
+
+
+def warm_worker(application):
+    """
+    Run in each worker after fork and before it accepts connections.
+    """
+    start = time.perf_counter()
+    warm_request(application)
+    connect_databases()
+    timings['worker_warm_up'] = (time.perf_counter() - start) * 1000
+    return timings['worker_warm_up']
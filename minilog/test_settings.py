@@ -0,0 +1,20 @@
+"""
+Settings for the test suite, used by `python manage.py test` (other runners
+need DJANGO_SETTINGS_MODULE=minilog.test_settings).
+
+Two entry shard databases are configured whatever ENTRY_SHARDS is, so the
+sharded tests can switch sharding on with override_settings, and caches are
+kept in memory.
+"""
+
+from .settings import *  # noqa: F401,F403
+from .settings import CACHES, DATABASES, entry_shard_database
+
+for index in range(2):
+    DATABASES.setdefault(f'entries_{index}', entry_shard_database(index))
+
+# Keep off the cache directories a running server uses
+CACHES = {
+    alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': f'minilog-tests-{alias}'}
+    for alias in CACHES
+}
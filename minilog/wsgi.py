@@ -2,15 +2,27 @@
 WSGI config for minilog project.
 
 It exposes the WSGI callable as a module-level variable named ``application``.
+The URL resolver, serializers and JWT backend are warmed at import time, so
+with gunicorn's preload_app (see gunicorn.conf.py) workers are forked ready.
+Set MINILOG_WARM_UP=0 to skip that.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
 """
 
 import os
+import time
 
-from django.core.wsgi import get_wsgi_application
+_start = time.perf_counter()
+
+from django.core.wsgi import get_wsgi_application  # noqa: E402
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'minilog.settings')
 
 application = get_wsgi_application()
+
+from minilog import startup  # noqa: E402
+
+startup.timings['import'] = (time.perf_counter() - _start) * 1000
+if os.environ.get('MINILOG_WARM_UP', '1') != '0':
+    startup.warm_up()